@@ -5,23 +5,51 @@ from __future__ import annotations
 
 import argparse
 import concurrent.futures
-import csv
+import functools
 import json
 import math
 import os
+import queue
 import random
 import sys
+import tempfile
+import threading
+import time
+import traceback
 import urllib.parse
 from collections import Counter
-from dataclasses import dataclass, field
+from contextlib import closing
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
+from multiprocessing import resource_tracker, shared_memory
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
+import numpy as np
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 import pyarrow.parquet as pq
 from sklearn.linear_model import LogisticRegression
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional runtime dependency
+    orjson = None
+
+from data_tools_lib.arrow_kernels import (
+    collapse_whitespace,
+    detector_codepoints,
+    has_visible_text,
+    japanese_char_counts,
+    normalized_lengths,
+    sha256_hexdigests,
+    text_candidate_stats,
+)
+from data_tools_lib.arrow_kernels import warm_up as warm_up_arrow_kernels
+from data_tools_lib.hash_kernels import hash_scores, logistic_logit, naive_bayes_logit, text_codepoints
+from data_tools_lib.hash_kernels import limit_threads as limit_hash_kernel_threads
+from data_tools_lib.hash_kernels import warm_up as warm_up_hash_kernels
 from data_tools_lib.text_pipeline import (
     DEFAULT_AI_COLUMNS,
     DEFAULT_AI_THRESHOLD,
@@ -50,7 +78,7 @@ from data_tools_lib.text_pipeline import (
     build_text_metrics,
     clamp,
     clamp01,
-    collapse_whitespace,
+    create_download_session,
     detector_normalize_text,
     ensure_download,
     fetch_and_extract_live_payload,
@@ -61,12 +89,36 @@ from data_tools_lib.text_pipeline import (
     normalize_live_value,
     read_live_manifest,
     sanitize_dataset_name,
-    text_hash,
     write_live_manifest,
 )
 
-WORKER_MODEL: Optional[Dict] = None
-WORKER_MODEL_JA: Optional[Dict] = None
+T = TypeVar("T")
+PARQUET_READ_BUFFER_SIZE = 4 * 1024 * 1024
+
+WORKER_MODEL: Optional["CompiledModel"] = None
+WORKER_MODEL_JA: Optional["CompiledModel"] = None
+CODEPOINT_ARENA = np.empty(0, dtype=np.uint32)
+SCORE_CACHE_SIZE = 65536
+EVALUATE_BATCH_SIZE = 8192
+EVALUATE_PREFETCH_BATCHES = 4
+MAX_EVALUATE_WORKERS = 32
+UNIFIED_LABELS = pa.array(["AI", "Human"], type=pa.string())
+LABEL_HUMAN = 0
+LABEL_AI = 1
+TEST_LABEL_NAMES = ("Human", "AI")
+PREDICTED_HUMAN = 0
+PREDICTED_UNKNOWN = 1
+PREDICTED_AI = 2
+IDX_TOTAL = 0
+IDX_SKIPPED = 1
+IDX_STRICT_CORRECT = 2
+IDX_DECIDED_ROWS = 3
+IDX_DECIDED_CORRECT = 4
+IDX_JP_ROWS = 5
+IDX_JP_STRICT_CORRECT = 6
+IDX_NON_JP_ROWS = 7
+IDX_NON_JP_STRICT_CORRECT = 8
+EVAL_COUNTER_SIZE = 9
 
 def command_download_hf(args: argparse.Namespace) -> None:
     dataset_name = args.dataset.strip()
@@ -85,28 +137,41 @@ def command_download_hf(args: argparse.Namespace) -> None:
     dataset_dir = Path(args.out_dir) / sanitize_dataset_name(dataset_name)
     dataset_dir.mkdir(parents=True, exist_ok=True)
 
+    jobs = max(1, int(args.jobs))
+    session = create_download_session(jobs)
+
     total_bytes = 0
     manifest_files = []
-    for idx, item in enumerate(files):
-        url = item["url"]
-        filename = item.get("filename") or os.path.basename(urllib.parse.urlparse(url).path)
-        out_name = f"{idx:04d}__{filename}"
-        out_path = dataset_dir / out_name
-        ensure_download(url, out_path)
-        size = out_path.stat().st_size
-        total_bytes += size
-        manifest_files.append(
-            {
-                "index": idx,
-                "config": item.get("config"),
-                "split": item.get("split"),
-                "source_url": url,
-                "source_filename": item.get("filename"),
-                "downloaded_path": str(out_path),
-                "size_bytes": size,
-            }
-        )
-        print(f"[ok] {idx + 1}/{len(files)} {out_name} ({size} bytes)")
+    completed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for idx, item in enumerate(files):
+            url = item["url"]
+            filename = item.get("filename") or os.path.basename(urllib.parse.urlparse(url).path)
+            out_name = f"{idx:04d}__{filename}"
+            out_path = dataset_dir / out_name
+            future = executor.submit(ensure_download, url, out_path, session)
+            futures[future] = (idx, item, out_name, out_path)
+
+        for future in concurrent.futures.as_completed(futures):
+            idx, item, out_name, out_path = futures[future]
+            future.result()
+            size = out_path.stat().st_size
+            total_bytes += size
+            manifest_files.append(
+                {
+                    "index": idx,
+                    "config": item.get("config"),
+                    "split": item.get("split"),
+                    "source_url": item["url"],
+                    "source_filename": item.get("filename"),
+                    "downloaded_path": str(out_path),
+                    "size_bytes": size,
+                }
+            )
+            completed += 1
+            print(f"[ok] {completed}/{len(files)} {out_name} ({size} bytes)")
+    manifest_files.sort(key=lambda entry: entry["index"])
 
     manifest = {
         "dataset": dataset_name,
@@ -116,18 +181,67 @@ def command_download_hf(args: argparse.Namespace) -> None:
         "total_bytes": total_bytes,
     }
     manifest_path = dataset_dir / "manifest.json"
-    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    manifest_path.write_text(format_json(manifest), encoding="utf-8")
     print(f"[done] manifest={manifest_path} total_bytes={total_bytes}")
 
 
+def strip_text_array(values: pa.Array) -> pa.Array:
+    return pc.utf8_trim_whitespace(pc.fill_null(values.cast(pa.string()), ""))
+
+
+def first_occurrence_mask(keys: np.ndarray) -> np.ndarray:
+    _, first_indices = np.unique(keys, return_index=True)
+    mask = np.zeros(len(keys), dtype=bool)
+    mask[first_indices] = True
+    return mask
+
+
+def select_test_candidates(
+    values: pa.Array,
+    column_index: int,
+    row_offset: int,
+    min_chars: int,
+    max_chars: int,
+) -> pa.Table:
+    filled = pc.fill_null(values.cast(pa.string()), "")
+    normalized_lengths, dedup_keys, stripped_lengths = text_candidate_stats(filled)
+    keep = normalized_lengths >= min_chars
+    source_rows = np.flatnonzero(keep) + row_offset
+    stripped_lengths = stripped_lengths[keep]
+    return pa.table(
+        {
+            "source_row": pa.array(source_rows, type=pa.int64()),
+            "column_index": pa.array(np.full(len(source_rows), column_index, dtype=np.int32)),
+            "dedup_key": pa.array(dedup_keys[keep], type=pa.uint64()),
+            "raw_text": pc.filter(filled, keep),
+            "original_text_length": pa.array(stripped_lengths, type=pa.int32()),
+            "text_length": pa.array(np.minimum(stripped_lengths, max_chars), type=pa.int32()),
+        }
+    )
+
+
+def dedupe_test_candidates(candidates: Sequence[pa.Table], seen_keys: set[int], max_chars: int) -> pa.Table:
+    merged = pa.concat_tables(candidates).sort_by([("source_row", "ascending"), ("column_index", "ascending")])
+    keys = merged.column("dedup_key").to_numpy()
+    keep = first_occurrence_mask(keys)
+    keep &= np.fromiter((key not in seen_keys for key in keys.tolist()), dtype=bool, count=len(keys))
+    survivors = merged.filter(keep)
+    seen_keys.update(survivors.column("dedup_key").to_pylist())
+    raw_text = survivors.column("raw_text").combine_chunks()
+    hashes = sha256_hexdigests(collapse_whitespace(raw_text))
+    text = pc.utf8_slice_codeunits(pc.utf8_trim_whitespace(raw_text), 0, max_chars)
+    survivors = survivors.drop_columns(["dedup_key", "raw_text"])
+    return survivors.add_column(2, "text", text).append_column("text_hash", pa.array(hashes, type=pa.string()))
+
+
 def to_test_records(
     parquet_path: Path,
     ai_columns: List[str],
     min_chars: int,
     max_chars: int,
-) -> Tuple[List[Dict], List[Dict]]:
-    table = pq.read_table(parquet_path)
-    columns = set(table.column_names)
+) -> Tuple[pa.Table, pa.Table, List[str]]:
+    parquet_file = open_parquet_file(parquet_path)
+    columns = set(parquet_file.schema_arrow.names)
 
     required = {"prompt", "Human_story"}
     missing = sorted(required - columns)
@@ -138,168 +252,193 @@ def to_test_records(
     if missing_ai_columns:
         raise ValueError(f"Missing AI columns: {missing_ai_columns}")
 
-    data = table.to_pydict()
-    total_rows = len(data["prompt"])
-    human_pool: List[Dict] = []
-    ai_pool: List[Dict] = []
-    seen_human_hash: set[str] = set()
-    seen_ai_hash: set[str] = set()
-
-    for row_index in range(total_rows):
-        prompt = (data["prompt"][row_index] or "").strip()
-        human_text = (data["Human_story"][row_index] or "").strip()
-        if len(collapse_whitespace(human_text)) >= min_chars:
-            human_trimmed = human_text[:max_chars]
-            human_hash = text_hash(human_text)
-            if human_hash not in seen_human_hash:
-                seen_human_hash.add(human_hash)
-                human_pool.append(
-                    {
-                        "source_row": row_index,
-                        "prompt": prompt,
-                        "model": "human",
-                        "label": "Human",
-                        "label_confidence": 0.98,
-                        "label_reason": "Human_story column (dataset-provided human text)",
-                        "text": human_trimmed,
-                        "text_hash": human_hash,
-                        "original_text_length": len(human_text),
-                        "text_length": len(human_trimmed),
-                    }
-                )
-
-        for column in ai_columns:
-            ai_text = (data[column][row_index] or "").strip()
-            if len(collapse_whitespace(ai_text)) < min_chars:
-                continue
-            ai_trimmed = ai_text[:max_chars]
-            ai_hash = text_hash(ai_text)
-            if ai_hash in seen_ai_hash:
-                continue
-            seen_ai_hash.add(ai_hash)
-            ai_pool.append(
-                {
-                    "source_row": row_index,
-                    "prompt": prompt,
-                    "model": column,
-                    "label": "AI",
-                    "label_confidence": 0.98,
-                    "label_reason": f"{column} column (dataset-provided model output)",
-                    "text": ai_trimmed,
-                    "text_hash": ai_hash,
-                    "original_text_length": len(ai_text),
-                    "text_length": len(ai_trimmed),
-                }
-            )
-
-    return human_pool, ai_pool
-
+    human_parts: List[pa.Table] = []
+    ai_parts: List[pa.Table] = []
+    seen_human_keys: set[int] = set()
+    seen_ai_keys: set[int] = set()
+    row_offset = 0
+    for batch in parquet_file.iter_batches(columns=["prompt", "Human_story"] + ai_columns, batch_size=8192):
+        prompts = strip_text_array(batch.column("prompt"))
+        human_candidates = dedupe_test_candidates(
+            [select_test_candidates(batch.column("Human_story"), 0, row_offset, min_chars, max_chars)],
+            seen_human_keys,
+            max_chars,
+        )
+        ai_candidates = dedupe_test_candidates(
+            [
+                select_test_candidates(batch.column(column), column_index, row_offset, min_chars, max_chars)
+                for column_index, column in enumerate(ai_columns)
+            ],
+            seen_ai_keys,
+            max_chars,
+        )
+        for parts, candidates in ((human_parts, human_candidates), (ai_parts, ai_candidates)):
+            local_rows = candidates.column("source_row").to_numpy() - row_offset
+            parts.append(candidates.append_column("prompt", pc.take(prompts, local_rows)))
+        row_offset += batch.num_rows
 
-def pick_balanced_ai(ai_pool: List[Dict], target_count: int, seed: int) -> List[Dict]:
-    by_model: Dict[str, List[Dict]] = {}
-    for item in ai_pool:
-        by_model.setdefault(item["model"], []).append(item)
+    model_names = ["human"] + list(ai_columns)
+    human_pool = test_pool_table(human_parts, LABEL_HUMAN, model_offset=0)
+    ai_pool = test_pool_table(ai_parts, LABEL_AI, model_offset=1)
+    return human_pool, ai_pool, model_names
 
-    rng = random.Random(seed)
-    for items in by_model.values():
-        rng.shuffle(items)
 
-    model_names = sorted(by_model.keys())
-    if not model_names:
-        return []
+def test_pool_table(parts: List[pa.Table], label_id: int, model_offset: int) -> pa.Table:
+    if not parts:
+        return pa.table(
+            {
+                "source_row": pa.array([], type=pa.int64()),
+                "model_id": pa.array([], type=pa.int8()),
+                "label": pa.array([], type=pa.int8()),
+                "prompt": pa.array([], type=pa.string()),
+                "text": pa.array([], type=pa.string()),
+                "text_hash": pa.array([], type=pa.string()),
+                "original_text_length": pa.array([], type=pa.int32()),
+                "text_length": pa.array([], type=pa.int32()),
+            }
+        )
+    merged = pa.concat_tables(parts)
+    model_ids = merged.column("column_index").to_numpy().astype(np.int8) + np.int8(model_offset)
+    return pa.table(
+        {
+            "source_row": merged.column("source_row"),
+            "model_id": pa.array(model_ids, type=pa.int8()),
+            "label": pa.array(np.full(merged.num_rows, label_id, dtype=np.int8)),
+            "prompt": merged.column("prompt"),
+            "text": merged.column("text"),
+            "text_hash": merged.column("text_hash"),
+            "original_text_length": merged.column("original_text_length"),
+            "text_length": merged.column("text_length"),
+        }
+    )
 
-    result: List[Dict] = []
-    model_index = 0
-    while len(result) < target_count:
-        model_name = model_names[model_index % len(model_names)]
-        pool = by_model[model_name]
-        if pool:
-            result.append(pool.pop())
-        model_index += 1
-        if all(len(items) == 0 for items in by_model.values()):
-            break
 
-    return result[:target_count]
+def balanced_quotas(available: np.ndarray, target_count: int) -> np.ndarray:
+    quotas = np.zeros(len(available), dtype=np.int64)
+    open_models = np.arange(len(available))
+    remaining = min(int(target_count), int(available.sum()))
+    while remaining > 0 and len(open_models):
+        share = remaining // len(open_models)
+        short = available[open_models] <= share
+        if short.any():
+            quotas[open_models[short]] = available[open_models[short]]
+            remaining -= int(available[open_models[short]].sum())
+            open_models = open_models[~short]
+            continue
+        quotas[open_models] = share
+        quotas[open_models[: remaining - share * len(open_models)]] += 1
+        break
+    return quotas
+
+
+def pick_balanced_ai(model_ids: np.ndarray, model_names: Sequence[str], target_count: int, seed: int) -> np.ndarray:
+    if not len(model_ids):
+        return np.zeros(0, dtype=np.int64)
+    name_ranks = np.argsort(np.argsort(np.asarray(model_names)))
+    _ranks, model_slots = np.unique(name_ranks[model_ids], return_inverse=True)
+    quotas = balanced_quotas(np.bincount(model_slots), target_count)
+
+    rng = np.random.default_rng(seed)
+    picks = [
+        rng.choice(np.flatnonzero(model_slots == slot), size=quota, replace=False)
+        for slot, quota in enumerate(quotas)
+        if quota
+    ]
+    if not picks:
+        return np.zeros(0, dtype=np.int64)
+    return rng.permutation(np.concatenate(picks))
 
 
 def sample_test_dataset(
-    human_pool: List[Dict],
-    ai_pool: List[Dict],
+    human_pool: pa.Table,
+    ai_pool: pa.Table,
+    model_names: Sequence[str],
     size: int,
     seed: int,
     source_dataset: str,
-) -> List[Dict]:
+) -> Tuple[pa.Table, Counter, Dict[str, int]]:
     human_count = size // 2
     ai_count = size - human_count
 
-    if len(human_pool) < human_count:
-        raise ValueError(f"Not enough human texts: need {human_count}, got {len(human_pool)}")
-    if len(ai_pool) < ai_count:
-        raise ValueError(f"Not enough AI texts: need {ai_count}, got {len(ai_pool)}")
+    if human_pool.num_rows < human_count:
+        raise ValueError(f"Not enough human texts: need {human_count}, got {human_pool.num_rows}")
+    if ai_pool.num_rows < ai_count:
+        raise ValueError(f"Not enough AI texts: need {ai_count}, got {ai_pool.num_rows}")
 
     rng = random.Random(seed)
-    human_candidates = list(human_pool)
+    human_candidates = list(range(human_pool.num_rows))
     rng.shuffle(human_candidates)
-    chosen_human = human_candidates[:human_count]
-    chosen_ai = pick_balanced_ai(ai_pool, target_count=ai_count, seed=seed)
-    if len(chosen_ai) < ai_count:
-        raise ValueError(f"Not enough balanced AI texts: need {ai_count}, got {len(chosen_ai)}")
+    chosen_human = human_pool.take(human_candidates[:human_count])
+    chosen_ai = ai_pool.take(
+        pick_balanced_ai(ai_pool.column("model_id").to_numpy(), model_names, target_count=ai_count, seed=seed)
+    )
+    if chosen_ai.num_rows < ai_count:
+        raise ValueError(f"Not enough balanced AI texts: need {ai_count}, got {chosen_ai.num_rows}")
+
+    order = list(range(chosen_human.num_rows + chosen_ai.num_rows))
+    rng.shuffle(order)
+    sample = pa.concat_tables([chosen_human, chosen_ai]).take(order)
+
+    labels = sample.column("label").to_numpy()
+    model_ids = sample.column("model_id").to_numpy()
+    label_counts = Counter(
+        {TEST_LABEL_NAMES[label_id]: int(count) for label_id, count in enumerate(np.bincount(labels, minlength=2))}
+    )
+    ai_model_ids = model_ids[labels == LABEL_AI]
+    present, first_seen, counts = np.unique(ai_model_ids, return_index=True, return_counts=True)
+    model_counts = {
+        model_names[present[slot]]: int(counts[slot]) for slot in np.argsort(first_seen)
+    }
+    return test_output_table(sample, model_names, source_dataset), label_counts, model_counts
 
+
+def test_output_table(sample: pa.Table, model_names: Sequence[str], source_dataset: str) -> pa.Table:
     now = datetime.now(timezone.utc).isoformat()
-    merged = chosen_human + chosen_ai
-    rng.shuffle(merged)
+    row_count = sample.num_rows
+    model_ids = sample.column("model_id")
+    reasons = ["Human_story column (dataset-provided human text)"] + [
+        f"{name} column (dataset-provided model output)" for name in model_names[1:]
+    ]
+    return pa.table(
+        {
+            "id": pa.array([f"sample-{index:04d}" for index in range(1, row_count + 1)], type=pa.string()),
+            "label": pa.array(TEST_LABEL_NAMES, type=pa.string()).take(sample.column("label")),
+            "label_confidence": pa.array(np.full(row_count, 0.98)),
+            "label_reason": pa.array(reasons, type=pa.string()).take(model_ids),
+            "source_dataset": pa.array([source_dataset] * row_count, type=pa.string()),
+            "source_row": sample.column("source_row"),
+            "prompt": sample.column("prompt"),
+            "model": pa.array(model_names, type=pa.string()).take(model_ids),
+            "original_text_length": sample.column("original_text_length"),
+            "text_length": sample.column("text_length"),
+            "text_hash": sample.column("text_hash"),
+            "retrieved_at": pa.array([now] * row_count, type=pa.string()),
+            "text": sample.column("text"),
+        }
+    )
 
-    output: List[Dict] = []
-    for index, item in enumerate(merged, start=1):
-        output.append(
-            {
-                "id": f"sample-{index:04d}",
-                "label": item["label"],
-                "label_confidence": item["label_confidence"],
-                "label_reason": item["label_reason"],
-                "source_dataset": source_dataset,
-                "source_row": item["source_row"],
-                "prompt": item["prompt"],
-                "model": item["model"],
-                "original_text_length": item["original_text_length"],
-                "text_length": item["text_length"],
-                "text_hash": item["text_hash"],
-                "retrieved_at": now,
-                "text": item["text"],
-            }
-        )
-    return output
+
+def format_json(value: object) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, indent=2)
 
 
 def write_jsonl(records: Iterable[Dict], path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
+    if orjson is not None:
+        with path.open("wb") as file:
+            for item in records:
+                file.write(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE))
+        return
     with path.open("w", encoding="utf-8") as file:
         for item in records:
             file.write(json.dumps(item, ensure_ascii=False) + "\n")
 
 
-def write_csv(records: Iterable[Dict], path: Path) -> None:
+def write_csv(table: pa.Table, path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    fields = [
-        "id",
-        "label",
-        "label_confidence",
-        "label_reason",
-        "source_dataset",
-        "source_row",
-        "prompt",
-        "model",
-        "original_text_length",
-        "text_length",
-        "text_hash",
-        "retrieved_at",
-        "text",
-    ]
-    with path.open("w", encoding="utf-8", newline="") as file:
-        writer = csv.DictWriter(file, fieldnames=fields)
-        writer.writeheader()
-        for item in records:
-            writer.writerow(item)
+    pa_csv.write_csv(table, str(path), write_options=pa_csv.WriteOptions(quoting_style="needed"))
 
 
 def command_build_test(args: argparse.Namespace) -> None:
@@ -308,32 +447,28 @@ def command_build_test(args: argparse.Namespace) -> None:
     output_jsonl = Path(args.output_jsonl)
     output_csv = Path(args.output_csv)
 
-    human_pool, ai_pool = to_test_records(
+    human_pool, ai_pool, model_names = to_test_records(
         parquet_path=input_path,
         ai_columns=ai_columns,
         min_chars=args.min_chars,
         max_chars=max(200, int(args.max_chars)),
     )
-    records = sample_test_dataset(
+    sample, label_counts, model_counts = sample_test_dataset(
         human_pool=human_pool,
         ai_pool=ai_pool,
+        model_names=model_names,
         size=args.size,
         seed=args.seed,
         source_dataset=args.source_dataset,
     )
-    write_jsonl(records, output_jsonl)
-    write_csv(records, output_csv)
-
-    model_counts: Dict[str, int] = {}
-    for item in records:
-        if item["label"] == "AI":
-            model_counts[item["model"]] = model_counts.get(item["model"], 0) + 1
+    write_jsonl(sample.to_pylist(), output_jsonl)
+    write_csv(sample, output_csv)
 
     print("Done")
     print(f"input={input_path}")
     print(f"jsonl={output_jsonl}")
     print(f"csv={output_csv}")
-    print(f"rows={len(records)} human={sum(1 for x in records if x['label'] == 'Human')} ai={sum(1 for x in records if x['label'] == 'AI')}")
+    print(f"rows={sample.num_rows} human={label_counts['Human']} ai={label_counts['AI']}")
     print(f"ai_models={json.dumps(model_counts, ensure_ascii=False)}")
 
 
@@ -362,51 +497,169 @@ def extract_assistant_text(messages) -> str:
     return "\n\n".join(fallback_parts)
 
 
+def extract_assistant_text_array(messages: pa.Array) -> pa.Array:
+    if not (pa.types.is_list(messages.type) or pa.types.is_large_list(messages.type)):
+        return pa.array([extract_assistant_text(value) for value in messages.to_pylist()], type=pa.string())
+    value_type = messages.type.value_type
+    if not pa.types.is_struct(value_type) or value_type.get_field_index("content") < 0:
+        return pa.array([extract_assistant_text(value) for value in messages.to_pylist()], type=pa.string())
+
+    row_count = len(messages)
+    entries = messages.flatten()
+    parents = pc.list_parent_indices(messages).to_numpy()
+    contents = strip_text_array(pc.cast(entries.field("content"), pa.string()))
+    has_content = pc.greater(pc.utf8_length(contents), 0).to_numpy(zero_copy_only=False)
+    if value_type.get_field_index("role") >= 0:
+        roles = pc.utf8_lower(pc.fill_null(pc.cast(entries.field("role"), pa.string()), ""))
+        is_assistant = pc.equal(roles, "assistant").to_numpy(zero_copy_only=False) & has_content
+    else:
+        is_assistant = np.zeros(len(entries), dtype=bool)
+
+    row_has_assistant = np.bincount(parents[is_assistant], minlength=row_count) > 0
+    keep = is_assistant | (has_content & ~row_has_assistant[parents])
+    counts = np.bincount(parents[keep], minlength=row_count)
+    offsets = np.zeros(row_count + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    parts = pa.ListArray.from_arrays(pa.array(offsets), contents.filter(pa.array(keep)))
+    return pc.binary_join(parts, "\n\n")
+
+
+def unified_label_array(label: str, length: int) -> pa.DictionaryArray:
+    indices = np.full(length, UNIFIED_LABELS.index(label).as_py(), dtype=np.int8)
+    return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int8()), UNIFIED_LABELS)
+
+
 class UnifiedWriter:
     def __init__(self, output_path: Path, batch_size: int = 5000):
         self.output_path = output_path
         self.batch_size = max(1, batch_size)
-        self.schema = pa.schema([("text", pa.string()), ("label", pa.string())])
+        self.schema = pa.schema([("text", pa.string()), ("label", pa.dictionary(pa.int8(), pa.string()))])
         self.writer = pq.ParquetWriter(output_path, self.schema, compression="zstd")
-        self.texts: List[str] = []
-        self.labels: List[str] = []
+        self.chunks: List[pa.RecordBatch] = []
+        self.rows_buffered = 0
         self.count = 0
 
     def add(self, text: str, label: str) -> None:
-        self.texts.append(text)
-        self.labels.append(label)
-        if len(self.texts) >= self.batch_size:
-            self.flush()
+        self.add_array(pa.array([text], type=pa.string()), unified_label_array(label, 1))
+
+    def add_array(self, texts: pa.Array, labels: pa.Array) -> None:
+        self.chunks.extend(pa.Table.from_arrays([texts, labels], schema=self.schema).to_batches())
+        self.rows_buffered += len(texts)
+        if self.rows_buffered >= self.batch_size:
+            self.flush(full_batches_only=True)
 
-    def flush(self) -> None:
-        if not self.texts:
+    def flush(self, full_batches_only: bool = False) -> None:
+        if not self.chunks:
             return
-        table = pa.Table.from_arrays(
-            [pa.array(self.texts, type=pa.string()), pa.array(self.labels, type=pa.string())],
-            schema=self.schema,
-        )
-        self.writer.write_table(table)
-        self.count += len(self.texts)
-        self.texts.clear()
-        self.labels.clear()
+        table = pa.Table.from_batches(self.chunks, schema=self.schema)
+        write_rows = table.num_rows - table.num_rows % self.batch_size if full_batches_only else table.num_rows
+        if write_rows:
+            self.writer.write_table(table.slice(0, write_rows), row_group_size=self.batch_size)
+        self.count += write_rows
+        self.chunks = table.slice(write_rows).to_batches()
+        self.rows_buffered = table.num_rows - write_rows
 
     def close(self) -> None:
         self.flush()
         self.writer.close()
 
 
-def sanitize_dataset_text(text: Optional[str], min_chars: int, max_chars: int) -> Optional[str]:
-    if not isinstance(text, str):
-        return None
-    value = text.strip()
-    if not value:
-        return None
-    normalized = collapse_whitespace(value)
-    if len(normalized) < min_chars:
-        return None
+def sanitize_text_array(values: pa.Array, min_chars: int, max_chars: int) -> Tuple[pa.Array, np.ndarray]:
+    stripped = strip_text_array(values)
+    rows = np.flatnonzero(normalized_lengths(stripped) >= max(1, min_chars))
+    texts = pc.take(stripped, rows)
     if max_chars > 0:
-        value = value[:max_chars]
-    return value
+        texts = pc.utf8_slice_codeunits(texts, 0, max_chars)
+    return texts, rows
+
+
+def prepare_text_columns(
+    labeled_columns: Sequence[Tuple[pa.Array, str]],
+    min_chars: int,
+    max_chars: int,
+) -> pa.Table:
+    parts: List[pa.Table] = []
+    for column_index, (values, label) in enumerate(labeled_columns):
+        texts, rows = sanitize_text_array(values, min_chars, max_chars)
+        parts.append(
+            pa.table(
+                {
+                    "row": pa.array(rows, type=pa.int64()),
+                    "column_index": pa.array(np.full(len(rows), column_index, dtype=np.int32)),
+                    "text": texts,
+                    "label": unified_label_array(label, len(rows)),
+                }
+            )
+        )
+    merged = pa.concat_tables(parts)
+    if len(parts) > 1:
+        merged = merged.sort_by([("row", "ascending"), ("column_index", "ascending")])
+    return merged.select(["text", "label"])
+
+
+def write_prepared_batches(writer: UnifiedWriter, prepared: Iterable[pa.Table]) -> int:
+    added = 0
+    for table in prepared:
+        if table.num_rows:
+            writer.add_array(table.column("text"), table.column("label"))
+            added += table.num_rows
+    return added
+
+
+class ProducerError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def iter_in_parallel(
+    sources: Sequence[Callable[[], Iterable[T]]],
+    max_workers: Optional[int] = None,
+    queue_size: int = 16,
+) -> Iterator[T]:
+    finished = object()
+    stop = threading.Event()
+    queues: List[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in sources]
+
+    def put(out: queue.Queue, item: object) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(source: Callable[[], Iterable[T]], out: queue.Queue) -> None:
+        try:
+            for item in source():
+                if not put(out, item):
+                    return
+            put(out, finished)
+        except BaseException as error:  # noqa: BLE001
+            put(out, ProducerError(error))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        for source, out in zip(sources, queues):
+            executor.submit(produce, source, out)
+        try:
+            for out in queues:
+                while True:
+                    item = out.get()
+                    if item is finished:
+                        break
+                    if isinstance(item, ProducerError):
+                        raise item.error
+                    yield item
+        finally:
+            stop.set()
+
+
+def open_parquet_file(parquet_path: Path) -> pq.ParquetFile:
+    return pq.ParquetFile(
+        pa.OSFile(str(parquet_path), "rb"),
+        buffer_size=PARQUET_READ_BUFFER_SIZE,
+        pre_buffer=True,
+    )
 
 
 def iter_parquet_files(dir_path: Path) -> Iterable[Path]:
@@ -417,77 +670,72 @@ def iter_parquet_files(dir_path: Path) -> Iterable[Path]:
 
 def add_gsingh(writer: UnifiedWriter, parquet_path: Path, min_chars: int, max_chars: int) -> int:
     added = 0
-    parquet_file = pq.ParquetFile(parquet_path)
+    parquet_file = open_parquet_file(parquet_path)
     columns = ["Human_story"] + DEFAULT_AI_COLUMNS
     for batch in parquet_file.iter_batches(columns=columns, batch_size=2048):
-        for row in batch.to_pylist():
-            human_text = sanitize_dataset_text(row.get("Human_story"), min_chars, max_chars)
-            if human_text:
-                writer.add(human_text, "Human")
-                added += 1
-            for column in DEFAULT_AI_COLUMNS:
-                ai_text = sanitize_dataset_text(row.get(column), min_chars, max_chars)
-                if ai_text:
-                    writer.add(ai_text, "AI")
-                    added += 1
+        labeled_columns = [(batch.column("Human_story"), "Human")]
+        labeled_columns.extend((batch.column(column), "AI") for column in DEFAULT_AI_COLUMNS)
+        added += write_prepared_batches(writer, [prepare_text_columns(labeled_columns, min_chars, max_chars)])
     return added
 
 
+def iter_dmitva_batches(parquet_path: Path, min_chars: int, max_chars: int) -> Iterator[pa.Table]:
+    parquet_file = open_parquet_file(parquet_path)
+    for batch in parquet_file.iter_batches(columns=["human_text", "ai_text"], batch_size=4096):
+        yield prepare_text_columns(
+            [(batch.column("human_text"), "Human"), (batch.column("ai_text"), "AI")],
+            min_chars,
+            max_chars,
+        )
+
+
 def add_dmitva(writer: UnifiedWriter, parquet_dir: Path, min_chars: int, max_chars: int) -> int:
-    added = 0
-    for parquet_path in iter_parquet_files(parquet_dir):
-        parquet_file = pq.ParquetFile(parquet_path)
-        for batch in parquet_file.iter_batches(columns=["human_text", "ai_text"], batch_size=4096):
-            for row in batch.to_pylist():
-                human_text = sanitize_dataset_text(row.get("human_text"), min_chars, max_chars)
-                if human_text:
-                    writer.add(human_text, "Human")
-                    added += 1
-                ai_text = sanitize_dataset_text(row.get("ai_text"), min_chars, max_chars)
-                if ai_text:
-                    writer.add(ai_text, "AI")
-                    added += 1
-    return added
+    sources = [
+        functools.partial(iter_dmitva_batches, parquet_path, min_chars, max_chars)
+        for parquet_path in iter_parquet_files(parquet_dir)
+    ]
+    return write_prepared_batches(writer, iter_in_parallel(sources))
+
+
+def iter_japanese_human_batches(parquet_path: Path, min_chars: int, max_chars: int) -> Iterator[pa.Table]:
+    parquet_file = open_parquet_file(parquet_path)
+    for batch in parquet_file.iter_batches(columns=["text"], batch_size=4096):
+        yield prepare_text_columns([(batch.column("text"), "Human")], min_chars, max_chars)
 
 
 def add_japanese_human(writer: UnifiedWriter, parquet_paths: List[Path], min_chars: int, max_chars: int) -> int:
-    added = 0
-    for parquet_path in parquet_paths:
-        parquet_file = pq.ParquetFile(parquet_path)
-        for batch in parquet_file.iter_batches(columns=["text"], batch_size=4096):
-            for row in batch.to_pylist():
-                text = sanitize_dataset_text(row.get("text"), min_chars, max_chars)
-                if not text:
-                    continue
-                writer.add(text, "Human")
-                added += 1
-    return added
+    sources = [
+        functools.partial(iter_japanese_human_batches, parquet_path, min_chars, max_chars)
+        for parquet_path in parquet_paths
+    ]
+    return write_prepared_batches(writer, iter_in_parallel(sources))
 
 
-def add_japanese_ai(writer: UnifiedWriter, min_chars: int, max_chars: int) -> int:
-    added = 0
-    for parquet_path in JAPANESE_AI_MESSAGE_PARQUET_PATHS:
-        parquet_file = pq.ParquetFile(parquet_path)
-        for batch in parquet_file.iter_batches(columns=["messages"], batch_size=1024):
-            for row in batch.to_pylist():
-                text = extract_assistant_text(row.get("messages"))
-                value = sanitize_dataset_text(text, min_chars, max_chars)
-                if not value:
-                    continue
-                writer.add(value, "AI")
-                added += 1
-
-    instruction_file = pq.ParquetFile(JAPANESE_AI_INSTRUCTION_PARQUET_PATH)
-    for batch in instruction_file.iter_batches(columns=["instruction", "output"], batch_size=2048):
-        for row in batch.to_pylist():
-            text = str(row.get("output") or "").strip() or str(row.get("instruction") or "").strip()
-            value = sanitize_dataset_text(text, min_chars, max_chars)
-            if not value:
-                continue
-            writer.add(value, "AI")
-            added += 1
+def iter_japanese_message_batches(parquet_path: Path, min_chars: int, max_chars: int) -> Iterator[pa.Table]:
+    parquet_file = open_parquet_file(parquet_path)
+    for batch in parquet_file.iter_batches(columns=["messages"], batch_size=1024):
+        texts = extract_assistant_text_array(batch.column("messages"))
+        yield prepare_text_columns([(texts, "AI")], min_chars, max_chars)
 
-    return added
+
+def iter_japanese_instruction_batches(parquet_path: Path, min_chars: int, max_chars: int) -> Iterator[pa.Table]:
+    parquet_file = open_parquet_file(parquet_path)
+    for batch in parquet_file.iter_batches(columns=["instruction", "output"], batch_size=2048):
+        output = strip_text_array(batch.column("output"))
+        instruction = strip_text_array(batch.column("instruction"))
+        texts = pc.if_else(pc.equal(pc.utf8_length(output), 0), instruction, output)
+        yield prepare_text_columns([(texts, "AI")], min_chars, max_chars)
+
+
+def add_japanese_ai(writer: UnifiedWriter, min_chars: int, max_chars: int) -> int:
+    sources = [
+        functools.partial(iter_japanese_message_batches, parquet_path, min_chars, max_chars)
+        for parquet_path in JAPANESE_AI_MESSAGE_PARQUET_PATHS
+    ]
+    sources.append(
+        functools.partial(iter_japanese_instruction_batches, JAPANESE_AI_INSTRUCTION_PARQUET_PATH, min_chars, max_chars)
+    )
+    return write_prepared_batches(writer, iter_in_parallel(sources))
 
 
 def command_build_unified(args: argparse.Namespace) -> None:
@@ -519,9 +767,10 @@ def command_build_unified(args: argparse.Namespace) -> None:
         "components": stats,
     }
     summary_path = Path("data/processed/unified_text_label_summary.json")
-    summary_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    summary_text = format_json(summary)
+    summary_path.write_text(summary_text, encoding="utf-8")
 
-    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    print(summary_text)
     print(f"summary={summary_path}")
 
 
@@ -539,14 +788,6 @@ def sigmoid(value: float) -> float:
     return z / (1.0 + z)
 
 
-def hash_trigram(text: str, start: int, dim: int) -> int:
-    h = 2166136261
-    for index in range(3):
-        h ^= ord(text[start + index])
-        h = (h * 16777619) & 0xFFFFFFFF
-    return h % dim
-
-
 def compute_hash_score(text: str, model: Dict) -> float:
     dim = max(1, int(model["dim"]))
     max_chars = max(200, int(model["max_chars"]))
@@ -556,27 +797,10 @@ def compute_hash_score(text: str, model: Dict) -> float:
     if len(normalized) < 3:
         return 0.5
 
-    limit = min(len(normalized), max_chars)
+    codepoints = text_codepoints(normalized[:max_chars])
     if model_type == "logistic_hash3":
-        weights = model["weights"]
-        bias = float(model["bias"])
-        trigram_count = max(1, limit - 2)
-        bucket_counts: Dict[int, int] = {}
-        for index in range(limit - 2):
-            bucket = hash_trigram(normalized, index, dim)
-            bucket_counts[bucket] = bucket_counts.get(bucket, 0) + 1
-        logit = bias
-        for bucket, count in bucket_counts.items():
-            logit += float(weights[bucket]) * (count / trigram_count)
-        return sigmoid(logit)
-
-    delta = model["delta"]
-    prior = float(model["prior_logit"])
-    logit = prior
-    for index in range(limit - 2):
-        bucket = hash_trigram(normalized, index, dim)
-        logit += float(delta[bucket])
-    return sigmoid(logit)
+        return sigmoid(logistic_logit(codepoints, model["weights"], float(model["bias"]), dim))
+    return sigmoid(naive_bayes_logit(codepoints, model["delta"], float(model["prior_logit"]), dim))
 
 
 def feature_vector_from_metrics(base_hash_score: float, metrics: Dict[str, float]) -> List[float]:
@@ -713,7 +937,7 @@ def load_model(path: Path) -> Dict:
         return {
             **base,
             "bias": float(model.get("bias") or 0.0),
-            "weights": [float(value) for value in weights],
+            "weights": np.asarray(weights, dtype=np.float64),
         }
 
     calibration = None
@@ -739,178 +963,253 @@ def load_model(path: Path) -> Dict:
     return {
         **base,
         "prior_logit": float(model.get("prior_logit") or 0.0),
-        "delta": [float(value) for value in delta],
+        "delta": np.asarray(delta, dtype=np.float64),
         "calibration": calibration,
     }
 
 
+@dataclass(frozen=True, slots=True)
+class CompiledModel:
+    name: str
+    dim: int
+    max_chars: int
+    logistic: bool
+    bias: float
+    table: np.ndarray
+    calibration: Optional[Dict]
+    score_cache: Dict[Tuple[int, int], float] = field(default_factory=dict, compare=False)
+    table_path: Optional[str] = None
+
+
+def compile_model(model: Dict) -> CompiledModel:
+    logistic = str(model.get("type") or "naive_bayes_hash3") == "logistic_hash3"
+    return CompiledModel(
+        name=str(model["name"]),
+        dim=max(1, int(model["dim"])),
+        max_chars=max(200, int(model["max_chars"])),
+        logistic=logistic,
+        bias=float(model["bias"] if logistic else model["prior_logit"]),
+        table=model["weights"] if logistic else model["delta"],
+        calibration=model.get("calibration"),
+    )
+
+
 @dataclass
 class EvalState:
-    total: int = 0
-    skipped: int = 0
-    strict_correct: int = 0
-    decided_rows: int = 0
-    decided_correct: int = 0
-    gt_counts: Counter = field(default_factory=Counter)
-    pred_counts: Counter = field(default_factory=Counter)
-    conf: Counter = field(default_factory=Counter)
+    counts: np.ndarray = field(default_factory=lambda: np.zeros(EVAL_COUNTER_SIZE, dtype=np.int64))
+    conf: np.ndarray = field(default_factory=lambda: np.zeros((2, 3), dtype=np.int64))
     score_sum: float = 0.0
-    jp_rows: int = 0
-    jp_strict_correct: int = 0
-    non_jp_rows: int = 0
-    non_jp_strict_correct: int = 0
 
 
-def init_worker(model: Dict, model_ja: Optional[Dict]) -> None:
+def export_model_table(model: CompiledModel, path: Path) -> CompiledModel:
+    np.save(path, model.table)
+    return replace(model, table=np.empty(0, dtype=model.table.dtype), table_path=str(path))
+
+
+def attach_model_table(model: CompiledModel) -> CompiledModel:
+    if model.table_path is None:
+        return model
+    return replace(model, table=np.asarray(np.load(model.table_path, mmap_mode="r")), table_path=None)
+
+
+def init_worker(model: CompiledModel, model_ja: Optional[CompiledModel]) -> None:
     global WORKER_MODEL
     global WORKER_MODEL_JA
-    WORKER_MODEL = model
-    WORKER_MODEL_JA = model_ja
+    WORKER_MODEL = attach_model_table(model)
+    WORKER_MODEL_JA = attach_model_table(model_ja) if model_ja is not None else None
+    # Parallelism comes from the process pool; one Numba thread per worker avoids oversubscription.
+    limit_hash_kernel_threads(1)
+    warm_up_hash_kernels()
+
+
+def codepoint_arena(size: int) -> np.ndarray:
+    global CODEPOINT_ARENA
+    if CODEPOINT_ARENA.shape[0] < size:
+        CODEPOINT_ARENA = np.empty(max(size, 2 * CODEPOINT_ARENA.shape[0]), dtype=np.uint32)
+    return CODEPOINT_ARENA
+
+
+def share_rows(rows: Tuple[np.ndarray, pa.Array]) -> Tuple[shared_memory.SharedMemory, int]:
+    labels, texts = rows
+    batch = pa.record_batch([pa.array(labels, type=pa.int8()), texts], names=["label", "text"])
+    sizer = pa.MockOutputStream()
+    with pa.ipc.new_stream(sizer, batch.schema) as writer:
+        writer.write_batch(batch)
+    nbytes = sizer.size()
+    segment = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(segment.buf)), batch.schema) as writer:
+        writer.write_batch(batch)
+    return segment, nbytes
+
+
+def evaluate_shared_rows(segment_name: str, nbytes: int, *args) -> Tuple[np.ndarray, np.ndarray, float]:
+    segment = shared_memory.SharedMemory(name=segment_name)
+    # The parent owns the segment; without this the worker's tracker warns about it and may unlink it.
+    resource_tracker.unregister(segment._name, "shared_memory")
+    batch = None
+    try:
+        batch = pa.ipc.open_stream(pa.py_buffer(segment.buf[:nbytes])).read_next_batch()
+        return evaluate_valid_rows((batch.column(0).to_numpy(), batch.column(1)), *args)
+    except BaseException as error:
+        traceback.clear_frames(error.__traceback__)
+        raise
+    finally:
+        # The Arrow buffers (and any traceback frame holding views of them) point into the segment;
+        # drop them before closing it.
+        batch = None
+        segment.close()
+
+
+def release_segment(segment: shared_memory.SharedMemory) -> None:
+    segment.close()
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def likely_japanese_mask(texts: pa.Array) -> np.ndarray:
+    jp_counts, sample_lengths = japanese_char_counts(texts)
+    return (jp_counts >= 40) | ((jp_counts >= 8) & (jp_counts / np.maximum(sample_lengths, 1) >= 0.03))
+
+
+def score_texts(
+    texts: pa.Array,
+    rows: np.ndarray,
+    normalized: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    model: CompiledModel,
+) -> np.ndarray:
+    codepoints, starts, ends = normalized
+    scores = hash_scores(codepoints, starts, ends, rows, model.max_chars, model.table, model.bias, model.dim, model.logistic)
+    calibration = model.calibration
+    if calibration:
+        cache = model.score_cache
+        for index, text in enumerate(texts.take(pa.array(rows, type=pa.int64())).to_pylist()):
+            key = (hash(text), len(text))
+            score = cache.get(key)
+            if score is None:
+                if len(cache) >= SCORE_CACHE_SIZE:
+                    del cache[next(iter(cache))]
+                score = cache[key] = apply_calibration(float(scores[index]), build_text_metrics(text), calibration)
+            scores[index] = score
+    return scores
 
 
 def evaluate_valid_rows(
-    rows: List[Tuple[str, str]],
+    rows: Tuple[np.ndarray, pa.Array],
     human_threshold: float,
     ai_threshold: float,
-    model: Optional[Dict] = None,
-    model_ja: Optional[Dict] = None,
+    model: Optional[CompiledModel] = None,
+    model_ja: Optional[CompiledModel] = None,
     human_threshold_ja: Optional[float] = None,
     ai_threshold_ja: Optional[float] = None,
-) -> Dict[str, float]:
+    detect_language: bool = True,
+) -> Tuple[np.ndarray, np.ndarray, float]:
     actual_model = model if model is not None else WORKER_MODEL
     actual_model_ja = model_ja if model_ja is not None else WORKER_MODEL_JA
     if actual_model is None:
         raise RuntimeError("Model is not initialized")
 
-    summary = {
-        "total": 0,
-        "strict_correct": 0,
-        "decided_rows": 0,
-        "decided_correct": 0,
-        "score_sum": 0.0,
-        "gt_ai": 0,
-        "gt_human": 0,
-        "pred_ai": 0,
-        "pred_human": 0,
-        "pred_unknown": 0,
-        "ai_ai": 0,
-        "ai_human": 0,
-        "ai_unknown": 0,
-        "human_ai": 0,
-        "human_human": 0,
-        "human_unknown": 0,
-        "jp_rows": 0,
-        "jp_strict_correct": 0,
-        "non_jp_rows": 0,
-        "non_jp_strict_correct": 0,
-    }
-
-    for ground_truth, text in rows:
-        row_model = actual_model
-        row_human_threshold = human_threshold
-        row_ai_threshold = ai_threshold
-
-        is_japanese = is_likely_japanese_text(text)
-        if actual_model_ja is not None and is_japanese:
-            row_model = actual_model_ja
-            row_human_threshold = human_threshold if human_threshold_ja is None else float(human_threshold_ja)
-            row_ai_threshold = ai_threshold if ai_threshold_ja is None else float(ai_threshold_ja)
-
-        score = compute_score(text, row_model)
-        predicted = predict_judge(score, human_threshold=row_human_threshold, ai_threshold=row_ai_threshold)
-
-        summary["total"] += 1
-        summary["score_sum"] += score
-        if predicted == ground_truth:
-            summary["strict_correct"] += 1
-
-        if is_japanese:
-            summary["jp_rows"] += 1
-            if predicted == ground_truth:
-                summary["jp_strict_correct"] += 1
-        else:
-            summary["non_jp_rows"] += 1
-            if predicted == ground_truth:
-                summary["non_jp_strict_correct"] += 1
-
-        if predicted != "Unknown":
-            summary["decided_rows"] += 1
-            if predicted == ground_truth:
-                summary["decided_correct"] += 1
-
-        if ground_truth == "AI":
-            summary["gt_ai"] += 1
-            if predicted == "AI":
-                summary["ai_ai"] += 1
-            elif predicted == "Human":
-                summary["ai_human"] += 1
-            else:
-                summary["ai_unknown"] += 1
-        else:
-            summary["gt_human"] += 1
-            if predicted == "AI":
-                summary["human_ai"] += 1
-            elif predicted == "Human":
-                summary["human_human"] += 1
-            else:
-                summary["human_unknown"] += 1
-
-        if predicted == "AI":
-            summary["pred_ai"] += 1
-        elif predicted == "Human":
-            summary["pred_human"] += 1
-        else:
-            summary["pred_unknown"] += 1
-
-    return summary
+    labels, texts = rows
+    normalized = detector_codepoints(texts, codepoint_arena(texts.nbytes))
+    is_japanese = likely_japanese_mask(texts) if detect_language else np.zeros(len(texts), dtype=np.bool_)
+    models = (actual_model, actual_model_ja)
+    model_index = is_japanese.astype(np.int8) if actual_model_ja is not None else np.zeros(len(texts), dtype=np.int8)
 
+    scores = np.empty(len(texts), dtype=np.float64)
+    for index, group_model in enumerate(models):
+        rows_in_group = np.flatnonzero(model_index == index)
+        if group_model is None or not len(rows_in_group):
+            continue
+        scores[rows_in_group] = score_texts(texts, rows_in_group, normalized, group_model)
+
+    uses_ja_thresholds = model_index == 1
+    ja_human_threshold = human_threshold if human_threshold_ja is None else float(human_threshold_ja)
+    ja_ai_threshold = ai_threshold if ai_threshold_ja is None else float(ai_threshold_ja)
+    human_thresholds = np.where(uses_ja_thresholds, ja_human_threshold, human_threshold)
+    ai_thresholds = np.where(uses_ja_thresholds, ja_ai_threshold, ai_threshold)
+    predicted = (scores >= human_thresholds).astype(np.int8) + (scores >= ai_thresholds)
+
+    correct = predicted == labels * PREDICTED_AI
+    decided = predicted != PREDICTED_UNKNOWN
+    counts = np.zeros(EVAL_COUNTER_SIZE, dtype=np.int64)
+    counts[IDX_TOTAL] = len(texts)
+    counts[IDX_STRICT_CORRECT] = correct.sum()
+    counts[IDX_DECIDED_ROWS] = decided.sum()
+    counts[IDX_DECIDED_CORRECT] = (correct & decided).sum()
+    if detect_language:
+        counts[IDX_JP_ROWS] = is_japanese.sum()
+        counts[IDX_JP_STRICT_CORRECT] = (correct & is_japanese).sum()
+        counts[IDX_NON_JP_ROWS] = (~is_japanese).sum()
+        counts[IDX_NON_JP_STRICT_CORRECT] = (correct & ~is_japanese).sum()
+    conf = np.bincount(labels * 3 + predicted, minlength=6).reshape(2, 3)
+    return counts, conf, sum(scores.tolist())
+
+
+def merge_partial_result(state: EvalState, part: Tuple[np.ndarray, np.ndarray, float]) -> None:
+    counts, conf, score_sum = part
+    state.counts += counts
+    state.conf += conf
+    state.score_sum += score_sum
+
+
+def select_valid_rows(
+    batch: pa.RecordBatch, max_rows: int, accepted_rows: int
+) -> Tuple[Tuple[np.ndarray, pa.Array], int, int, bool]:
+    labels = pc.utf8_lower(strip_text_array(pc.cast(batch.column("label"), pa.string())))
+    texts = pc.fill_null(pc.cast(batch.column("text"), pa.string()), "")
+    is_ai = pc.equal(labels, "ai").to_numpy(zero_copy_only=False)
+    is_labeled = is_ai | pc.equal(labels, "human").to_numpy(zero_copy_only=False)
+    has_text = has_visible_text(texts)
+    valid = is_labeled & has_text
 
-def merge_partial_result(state: EvalState, part: Dict[str, float]) -> None:
-    state.total += int(part["total"])
-    state.strict_correct += int(part["strict_correct"])
-    state.decided_rows += int(part["decided_rows"])
-    state.decided_correct += int(part["decided_correct"])
-    state.score_sum += float(part["score_sum"])
-    state.gt_counts["AI"] += int(part["gt_ai"])
-    state.gt_counts["Human"] += int(part["gt_human"])
-    state.pred_counts["AI"] += int(part["pred_ai"])
-    state.pred_counts["Human"] += int(part["pred_human"])
-    state.pred_counts["Unknown"] += int(part["pred_unknown"])
-    state.conf[("AI", "AI")] += int(part["ai_ai"])
-    state.conf[("AI", "Human")] += int(part["ai_human"])
-    state.conf[("AI", "Unknown")] += int(part["ai_unknown"])
-    state.conf[("Human", "AI")] += int(part["human_ai"])
-    state.conf[("Human", "Human")] += int(part["human_human"])
-    state.conf[("Human", "Unknown")] += int(part["human_unknown"])
-    state.jp_rows += int(part["jp_rows"])
-    state.jp_strict_correct += int(part["jp_strict_correct"])
-    state.non_jp_rows += int(part["non_jp_rows"])
-    state.non_jp_strict_correct += int(part["non_jp_strict_correct"])
-
-
-def select_valid_rows(rows: List[Dict], max_rows: int, accepted_rows: int) -> Tuple[List[Tuple[str, str]], int, int, bool]:
-    valid_rows: List[Tuple[str, str]] = []
-    skipped = 0
     stop = False
+    rows_seen = len(valid)
+    valid_positions = np.flatnonzero(valid)
+    if max_rows > 0 and accepted_rows + len(valid_positions) >= max_rows:
+        valid_positions = valid_positions[: max_rows - accepted_rows]
+        rows_seen = int(valid_positions[-1]) + 1 if len(valid_positions) else 0
+        stop = True
+    skipped = rows_seen - len(valid_positions)
+    accepted_rows += len(valid_positions)
+
+    selected_texts = texts.take(pa.array(valid_positions, type=pa.int64()))
+    selected_labels = np.where(is_ai[valid_positions], LABEL_AI, LABEL_HUMAN).astype(np.int8)
+    return (selected_labels, selected_texts), accepted_rows, skipped, stop
+
+
+def prefetch_evaluate_batches(parquet_path: Path, batch_size: int) -> Iterator[pa.RecordBatch]:
+    parquet_file = open_parquet_file(parquet_path)
+    return iter_in_parallel(
+        [lambda: parquet_file.iter_batches(columns=["text", "label"], batch_size=batch_size, use_threads=True)],
+        max_workers=1,
+        queue_size=EVALUATE_PREFETCH_BATCHES,
+    )
 
-    for row in rows:
-        ground_truth_raw = str(row.get("label") or "").strip().lower()
-        if ground_truth_raw not in ("ai", "human"):
-            skipped += 1
-            continue
-        ground_truth = "AI" if ground_truth_raw == "ai" else "Human"
-        text = str(row.get("text") or "")
-        if not detector_normalize_text(text):
-            skipped += 1
-            continue
-
-        valid_rows.append((ground_truth, text))
-        accepted_rows += 1
-        if max_rows > 0 and accepted_rows >= max_rows:
-            stop = True
-            break
 
-    return valid_rows, accepted_rows, skipped, stop
+def process_batch(
+    batch: pa.RecordBatch,
+    max_rows: int,
+    accepted_rows: int,
+    model: CompiledModel,
+    model_ja: Optional[CompiledModel],
+    thresholds: Tuple[float, float],
+    thresholds_ja: Tuple[float, float],
+    detect_language: bool,
+) -> Tuple[Tuple[np.ndarray, np.ndarray, float], int, bool]:
+    rows, accepted_rows, skipped, stop = select_valid_rows(batch, max_rows, accepted_rows)
+    counts, conf, score_sum = evaluate_valid_rows(
+        rows,
+        human_threshold=thresholds[0],
+        ai_threshold=thresholds[1],
+        model=model,
+        model_ja=model_ja,
+        human_threshold_ja=thresholds_ja[0],
+        ai_threshold_ja=thresholds_ja[1],
+        detect_language=detect_language,
+    )
+    counts[IDX_SKIPPED] += skipped
+    return (counts, conf, score_sum), accepted_rows, stop
 
 
 def precision_recall_f1(tp: int, fp: int, fn: int) -> Tuple[float, float, float]:
@@ -930,117 +1229,159 @@ def run_evaluation(
     ai_threshold_ja: float,
     max_rows: int,
     workers: int,
+    report_language: bool = False,
+    batch_size: int = EVALUATE_BATCH_SIZE,
 ) -> Dict:
-    state = EvalState(gt_counts=Counter(), pred_counts=Counter(), conf=Counter())
-    parquet_file = pq.ParquetFile(parquet_path)
+    state = EvalState()
+    detect_language = model_ja is not None or report_language
+    compiled_model = compile_model(model)
+    compiled_model_ja = compile_model(model_ja) if model_ja is not None else None
     worker_count = max(1, int(workers))
     accepted_rows = 0
 
-    if worker_count == 1:
-        for batch in parquet_file.iter_batches(columns=["text", "label"], batch_size=2048):
-            valid_rows, accepted_rows, skipped, should_stop = select_valid_rows(batch.to_pylist(), max_rows, accepted_rows)
-            state.skipped += skipped
-            if valid_rows:
-                merge_partial_result(
-                    state,
-                    evaluate_valid_rows(
-                        valid_rows,
-                        human_threshold=human_threshold,
-                        ai_threshold=ai_threshold,
-                        model=model,
-                        model_ja=model_ja,
-                        human_threshold_ja=human_threshold_ja,
-                        ai_threshold_ja=ai_threshold_ja,
-                    ),
+    with closing(prefetch_evaluate_batches(parquet_path, batch_size)) as batches:
+        if worker_count == 1:
+            for batch in batches:
+                part, accepted_rows, should_stop = process_batch(
+                    batch,
+                    max_rows,
+                    accepted_rows,
+                    compiled_model,
+                    compiled_model_ja,
+                    (human_threshold, ai_threshold),
+                    (human_threshold_ja, ai_threshold_ja),
+                    detect_language,
                 )
-            if should_stop:
-                break
-    else:
-        max_inflight = max(2, worker_count * 3)
-        pending: List[concurrent.futures.Future] = []
-        with concurrent.futures.ProcessPoolExecutor(
-            max_workers=worker_count,
-            initializer=init_worker,
-            initargs=(model, model_ja),
-        ) as executor:
-            for batch in parquet_file.iter_batches(columns=["text", "label"], batch_size=2048):
-                valid_rows, accepted_rows, skipped, should_stop = select_valid_rows(batch.to_pylist(), max_rows, accepted_rows)
-                state.skipped += skipped
-
-                if valid_rows:
-                    pending.append(
-                        executor.submit(
-                            evaluate_valid_rows,
-                            valid_rows,
-                            human_threshold,
-                            ai_threshold,
-                            None,
-                            None,
-                            human_threshold_ja,
-                            ai_threshold_ja,
-                        )
-                    )
-
-                if len(pending) >= max_inflight:
-                    done, not_done = concurrent.futures.wait(
-                        pending,
-                        return_when=concurrent.futures.FIRST_COMPLETED,
-                    )
-                    pending = list(not_done)
-                    for future in done:
-                        merge_partial_result(state, future.result())
-
+                merge_partial_result(state, part)
                 if should_stop:
                     break
-
-            for future in concurrent.futures.as_completed(pending):
-                merge_partial_result(state, future.result())
-
-    tp_ai = state.conf[("AI", "AI")]
-    fp_ai = state.conf[("Human", "AI")]
-    fn_ai = state.conf[("AI", "Human")] + state.conf[("AI", "Unknown")]
+        else:
+            max_inflight = max(2, worker_count * 3)
+            pending: List[concurrent.futures.Future] = []
+            segments: Dict[concurrent.futures.Future, shared_memory.SharedMemory] = {}
+            table_directory = tempfile.TemporaryDirectory(prefix="evaluate_tables_")
+            try:
+                table_root = Path(table_directory.name)
+                shared_model = export_model_table(compiled_model, table_root / "model.npy")
+                shared_model_ja = (
+                    export_model_table(compiled_model_ja, table_root / "model_ja.npy") if compiled_model_ja is not None else None
+                )
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=worker_count,
+                    initializer=init_worker,
+                    initargs=(shared_model, shared_model_ja),
+                ) as executor:
+                    # Fork every worker now, while the prefetch thread (started by the first next()) does not
+                    # exist yet: forking a process with live threads can deadlock the child.
+                    executor.submit(os.getpid).result()
+                    for batch in batches:
+                        valid_rows, accepted_rows, skipped, should_stop = select_valid_rows(batch, max_rows, accepted_rows)
+                        state.counts[IDX_SKIPPED] += skipped
+
+                        if len(valid_rows[1]):
+                            segment, nbytes = share_rows(valid_rows)
+                            future = executor.submit(
+                                evaluate_shared_rows,
+                                segment.name,
+                                nbytes,
+                                human_threshold,
+                                ai_threshold,
+                                None,
+                                None,
+                                human_threshold_ja,
+                                ai_threshold_ja,
+                                detect_language,
+                            )
+                            segments[future] = segment
+                            pending.append(future)
+
+                        if len(pending) >= max_inflight:
+                            done, not_done = concurrent.futures.wait(
+                                pending,
+                                return_when=concurrent.futures.FIRST_COMPLETED,
+                            )
+                            pending = list(not_done)
+                            for future in done:
+                                release_segment(segments.pop(future))
+                                merge_partial_result(state, future.result())
+
+                        if should_stop:
+                            break
+
+                    for future in concurrent.futures.as_completed(pending):
+                        release_segment(segments.pop(future))
+                        merge_partial_result(state, future.result())
+            finally:
+                for segment in segments.values():
+                    release_segment(segment)
+                table_directory.cleanup()
+
+    counts = state.counts.tolist()
+    conf = state.conf.tolist()
+    ai_row = conf[LABEL_AI]
+    human_row = conf[LABEL_HUMAN]
+    pred_counts = state.conf.sum(axis=0).tolist()
+    total = counts[IDX_TOTAL]
+    tp_ai = ai_row[PREDICTED_AI]
+    fp_ai = human_row[PREDICTED_AI]
+    fn_ai = ai_row[PREDICTED_HUMAN] + ai_row[PREDICTED_UNKNOWN]
     precision_ai, recall_ai, f1_ai = precision_recall_f1(tp_ai, fp_ai, fn_ai)
 
-    tp_human = state.conf[("Human", "Human")]
-    fp_human = state.conf[("AI", "Human")]
-    fn_human = state.conf[("Human", "AI")] + state.conf[("Human", "Unknown")]
+    tp_human = human_row[PREDICTED_HUMAN]
+    fp_human = ai_row[PREDICTED_HUMAN]
+    fn_human = human_row[PREDICTED_AI] + human_row[PREDICTED_UNKNOWN]
     precision_human, recall_human, f1_human = precision_recall_f1(tp_human, fp_human, fn_human)
 
-    strict_accuracy = state.strict_correct / state.total if state.total else 0.0
-    decided_accuracy = state.decided_correct / state.decided_rows if state.decided_rows else 0.0
-    coverage = state.decided_rows / state.total if state.total else 0.0
-    unknown_rate = state.pred_counts["Unknown"] / state.total if state.total else 0.0
-    average_score = state.score_sum / state.total if state.total else 0.0
-    jp_strict_accuracy = state.jp_strict_correct / state.jp_rows if state.jp_rows else 0.0
-    non_jp_strict_accuracy = state.non_jp_strict_correct / state.non_jp_rows if state.non_jp_rows else 0.0
+    decided_rows = counts[IDX_DECIDED_ROWS]
+    jp_rows = counts[IDX_JP_ROWS]
+    non_jp_rows = counts[IDX_NON_JP_ROWS]
+    strict_accuracy = counts[IDX_STRICT_CORRECT] / total if total else 0.0
+    decided_accuracy = counts[IDX_DECIDED_CORRECT] / decided_rows if decided_rows else 0.0
+    coverage = decided_rows / total if total else 0.0
+    unknown_rate = pred_counts[PREDICTED_UNKNOWN] / total if total else 0.0
+    average_score = state.score_sum / total if total else 0.0
+    jp_strict_accuracy = counts[IDX_JP_STRICT_CORRECT] / jp_rows if jp_rows else 0.0
+    non_jp_strict_accuracy = counts[IDX_NON_JP_STRICT_CORRECT] / non_jp_rows if non_jp_rows else 0.0
 
     return {
         "input": str(parquet_path),
         "thresholds": {"human_max": round(human_threshold, 4), "ai_min": round(ai_threshold, 4)},
         "thresholds_ja": {"human_max": round(human_threshold_ja, 4), "ai_min": round(ai_threshold_ja, 4)},
         "max_rows": max_rows,
-        "processed_rows": state.total,
-        "skipped_rows": state.skipped,
+        "processed_rows": total,
+        "skipped_rows": counts[IDX_SKIPPED],
         "strict_accuracy": round(strict_accuracy, 6),
         "decided_accuracy": round(decided_accuracy, 6),
         "coverage": round(coverage, 6),
         "unknown_rate": round(unknown_rate, 6),
         "avg_score": round(average_score, 4),
-        "language_segments": {
-            "jp_rows": state.jp_rows,
-            "jp_strict_accuracy": round(jp_strict_accuracy, 6),
-            "non_jp_rows": state.non_jp_rows,
-            "non_jp_strict_accuracy": round(non_jp_strict_accuracy, 6),
-        },
-        "ground_truth_counts": dict(state.gt_counts),
-        "prediction_counts": dict(state.pred_counts),
+        "language_segments": (
+            {
+                "jp_rows": jp_rows,
+                "jp_strict_accuracy": round(jp_strict_accuracy, 6),
+                "non_jp_rows": non_jp_rows,
+                "non_jp_strict_accuracy": round(non_jp_strict_accuracy, 6),
+            }
+            if detect_language
+            else None
+        ),
+        "ground_truth_counts": {"AI": sum(ai_row), "Human": sum(human_row)} if total else {},
+        "prediction_counts": (
+            {
+                "AI": pred_counts[PREDICTED_AI],
+                "Human": pred_counts[PREDICTED_HUMAN],
+                "Unknown": pred_counts[PREDICTED_UNKNOWN],
+            }
+            if total
+            else {}
+        ),
         "confusion_matrix": {
-            "AI->AI": state.conf[("AI", "AI")],
-            "AI->Human": state.conf[("AI", "Human")],
-            "AI->Unknown": state.conf[("AI", "Unknown")],
-            "Human->AI": state.conf[("Human", "AI")],
-            "Human->Human": state.conf[("Human", "Human")],
-            "Human->Unknown": state.conf[("Human", "Unknown")],
+            "AI->AI": ai_row[PREDICTED_AI],
+            "AI->Human": ai_row[PREDICTED_HUMAN],
+            "AI->Unknown": ai_row[PREDICTED_UNKNOWN],
+            "Human->AI": human_row[PREDICTED_AI],
+            "Human->Human": human_row[PREDICTED_HUMAN],
+            "Human->Unknown": human_row[PREDICTED_UNKNOWN],
         },
         "metrics": {
             "AI": {"precision": round(precision_ai, 6), "recall": round(recall_ai, 6), "f1": round(f1_ai, 6)},
@@ -1100,7 +1441,9 @@ def command_evaluate(args: argparse.Namespace) -> None:
         human_threshold_ja=human_threshold_ja,
         ai_threshold_ja=ai_threshold_ja,
         max_rows=max(0, int(args.max_rows)),
-        workers=max(1, int(args.workers)),
+        workers=resolve_worker_count(args.workers),
+        report_language=args.report_language,
+        batch_size=max(1, int(args.batch_size)),
     )
 
     output_path = Path(args.output)
@@ -1111,6 +1454,25 @@ def command_evaluate(args: argparse.Namespace) -> None:
     print(f"summary={output_path}")
 
 
+def resolve_worker_count(requested: int) -> int:
+    if requested > 0:
+        return int(requested)
+    if hasattr(os, "sched_getaffinity"):
+        available = len(os.sched_getaffinity(0))
+    else:  # pragma: no cover - macOS / Windows
+        available = os.cpu_count() or 1
+    return max(1, min(available, MAX_EVALUATE_WORKERS))
+
+
+def command_compile_kernels(args: argparse.Namespace) -> None:
+    timings = {}
+    for name, warm_up in (("arrow_kernels", warm_up_arrow_kernels), ("hash_kernels", warm_up_hash_kernels)):
+        started = time.perf_counter()
+        warm_up()
+        timings[name] = round(time.perf_counter() - started, 3)
+    print(format_json({"compiled_seconds": timings}))
+
+
 def resolve_model_thresholds(model: Dict) -> Tuple[float, float]:
     thresholds = model.get("thresholds") or {}
     human = clamp(float(thresholds.get("human_max", DEFAULT_HUMAN_THRESHOLD)), 0.0, 1.0)
@@ -2159,6 +2521,7 @@ def build_parser() -> argparse.ArgumentParser:
     download_parser = subparsers.add_parser("download-hf", help="Download all parquet shards from a Hugging Face dataset")
     download_parser.add_argument("--dataset", required=True, help="HF dataset id, e.g. org/name")
     download_parser.add_argument("--out-dir", default="data/raw", help="Base output directory")
+    download_parser.add_argument("--jobs", type=int, default=8, help="Number of shards downloaded concurrently")
     download_parser.set_defaults(func=command_download_hf)
 
     build_unified_parser = subparsers.add_parser("build-unified", help="Build unified parquet dataset with text and label columns")
@@ -2250,11 +2613,27 @@ def build_parser() -> argparse.ArgumentParser:
     evaluate_parser.add_argument(
         "--workers",
         type=int,
-        default=10,
-        help="Parallel worker count (1 disables parallel execution)",
+        default=0,
+        help="Parallel worker count (1 disables parallel execution, 0 uses one per available CPU up to 32)",
+    )
+    evaluate_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EVALUATE_BATCH_SIZE,
+        help="Rows read from the parquet file per batch; each batch is one worker task",
+    )
+    evaluate_parser.add_argument(
+        "--report-language",
+        action="store_true",
+        help="Report JP/non-JP accuracy even without --model-ja (language detection is skipped otherwise)",
     )
     evaluate_parser.set_defaults(func=command_evaluate)
 
+    compile_kernels_parser = subparsers.add_parser(
+        "compile-kernels", help="Compile the Numba kernels into their on-disk cache ahead of a run"
+    )
+    compile_kernels_parser.set_defaults(func=command_compile_kernels)
+
     verify_live_parser = subparsers.add_parser("verify-live", help="Fetch live URLs, extract text, and refresh verification hashes")
     verify_live_parser.add_argument("--input", default=str(DEFAULT_WEB_HUMAN_MANIFEST), help="Live manifest CSV path")
     verify_live_parser.add_argument("--cache-dir", default=str(DEFAULT_LIVE_CACHE_DIR), help="Local ignored cache directory")
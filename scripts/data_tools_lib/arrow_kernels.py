@@ -0,0 +1,394 @@
+"""Numba kernels over Arrow string buffers for data_tools."""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - optional runtime dependency
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+
+from data_tools_lib.text_pipeline import JAPANESE_SAMPLE_CHARS, detector_normalize_text
+
+
+@njit(cache=True, inline="always")
+def is_space_codepoint(codepoint: int) -> bool:
+    if codepoint <= 0x20:
+        return codepoint == 0x20 or 0x09 <= codepoint <= 0x0D or 0x1C <= codepoint <= 0x1F
+    if codepoint < 0x85:
+        return False
+    return (
+        codepoint == 0x85
+        or codepoint == 0xA0
+        or codepoint == 0x1680
+        or 0x2000 <= codepoint <= 0x200A
+        or codepoint == 0x2028
+        or codepoint == 0x2029
+        or codepoint == 0x202F
+        or codepoint == 0x205F
+        or codepoint == 0x3000
+    )
+
+
+@njit(cache=True, inline="always")
+def decode_utf8(data: np.ndarray, position: int) -> Tuple[int, int]:
+    lead = int(data[position])
+    if lead < 0x80:
+        return lead, position + 1
+    if lead < 0xE0:
+        return ((lead & 0x1F) << 6) | (int(data[position + 1]) & 0x3F), position + 2
+    if lead < 0xF0:
+        return (
+            ((lead & 0x0F) << 12) | ((int(data[position + 1]) & 0x3F) << 6) | (int(data[position + 2]) & 0x3F),
+            position + 3,
+        )
+    return (
+        ((lead & 0x07) << 18)
+        | ((int(data[position + 1]) & 0x3F) << 12)
+        | ((int(data[position + 2]) & 0x3F) << 6)
+        | (int(data[position + 3]) & 0x3F),
+        position + 4,
+    )
+
+
+# nogil rather than parallel: build-unified already runs loaders on a thread pool, and the
+# default workqueue threading layer aborts when parallel kernels are launched concurrently.
+@njit(cache=True, nogil=True)
+def normalized_lengths_kernel(offsets: np.ndarray, data: np.ndarray, out_lengths: np.ndarray) -> None:
+    for row in range(out_lengths.shape[0]):
+        position = offsets[row]
+        end = offsets[row + 1]
+        length = 0
+        seen_text = False
+        pending_space = False
+        while position < end:
+            codepoint, position = decode_utf8(data, position)
+            if is_space_codepoint(codepoint):
+                pending_space = seen_text
+                continue
+            if pending_space:
+                length += 1
+                pending_space = False
+            length += 1
+            seen_text = True
+        out_lengths[row] = length
+
+
+@njit(cache=True, nogil=True)
+def collapse_whitespace_kernel(
+    offsets: np.ndarray,
+    data: np.ndarray,
+    out_offsets: np.ndarray,
+    out_data: np.ndarray,
+) -> None:
+    write = 0
+    out_offsets[0] = 0
+    for row in range(out_offsets.shape[0] - 1):
+        position = offsets[row]
+        end = offsets[row + 1]
+        seen_text = False
+        pending_space = False
+        while position < end:
+            lead = data[position]
+            if 0x20 < lead < 0x80:
+                if pending_space:
+                    out_data[write] = 0x20
+                    write += 1
+                    pending_space = False
+                out_data[write] = lead
+                write += 1
+                seen_text = True
+                position += 1
+                continue
+            codepoint, next_position = decode_utf8(data, position)
+            if is_space_codepoint(codepoint):
+                pending_space = seen_text
+            else:
+                if pending_space:
+                    out_data[write] = 0x20
+                    write += 1
+                    pending_space = False
+                while position < next_position:
+                    out_data[write] = data[position]
+                    write += 1
+                    position += 1
+                seen_text = True
+            position = next_position
+        out_offsets[row + 1] = write
+
+
+FNV64_OFFSET_BASIS = np.uint64(14695981039346656037)
+FNV64_PRIME = np.uint64(1099511628211)
+
+
+@njit(cache=True, inline="always")
+def fnv1a_byte(state: np.uint64, byte: int) -> np.uint64:
+    return (state ^ np.uint64(byte)) * FNV64_PRIME
+
+
+# Only build-test calls this, from the main thread, so prange is safe here (unlike the loader kernels).
+@njit(cache=True, parallel=True)
+def text_candidate_kernel(
+    offsets: np.ndarray,
+    data: np.ndarray,
+    out_normalized_lengths: np.ndarray,
+    out_hashes: np.ndarray,
+    out_stripped_lengths: np.ndarray,
+) -> None:
+    for row in prange(out_hashes.shape[0]):
+        position = offsets[row]
+        end = offsets[row + 1]
+        state = FNV64_OFFSET_BASIS
+        normalized_length = 0
+        stripped_length = 0
+        chars_since_text = 0
+        seen_text = False
+        pending_space = False
+        while position < end:
+            codepoint, next_position = decode_utf8(data, position)
+            if seen_text:
+                chars_since_text += 1
+            if is_space_codepoint(codepoint):
+                pending_space = seen_text
+                position = next_position
+                continue
+            if pending_space:
+                state = fnv1a_byte(state, 0x20)
+                normalized_length += 1
+                pending_space = False
+            while position < next_position:
+                state = fnv1a_byte(state, data[position])
+                position += 1
+            normalized_length += 1
+            if not seen_text:
+                seen_text = True
+                chars_since_text = 1
+            stripped_length = chars_since_text
+        out_normalized_lengths[row] = normalized_length
+        out_hashes[row] = state
+        out_stripped_lengths[row] = stripped_length
+
+
+# Not parallel: evaluate's parent process calls this, and must not start Numba's thread pool before forking workers.
+@njit(cache=True, nogil=True)
+def has_visible_text_kernel(offsets: np.ndarray, data: np.ndarray, out_visible: np.ndarray) -> None:
+    for row in range(out_visible.shape[0]):
+        position = offsets[row]
+        end = offsets[row + 1]
+        while position < end:
+            codepoint, position = decode_utf8(data, position)
+            if not is_space_codepoint(codepoint):
+                out_visible[row] = True
+                break
+
+
+LOWERCASE_TABLE_SIZE = 0x20000
+DOTTED_CAPITAL_I = 0x130
+CAPITAL_SIGMA = 0x3A3
+
+
+@functools.lru_cache(maxsize=None)
+def lowercase_table() -> np.ndarray:
+    table = np.arange(LOWERCASE_TABLE_SIZE, dtype=np.uint32)
+    for codepoint in range(0x80, LOWERCASE_TABLE_SIZE):
+        lowered = chr(codepoint).lower()
+        if len(lowered) == 1:
+            table[codepoint] = ord(lowered)
+    return table
+
+
+@njit(cache=True, inline="always")
+def is_detector_space_codepoint(codepoint: int) -> bool:
+    return codepoint == 0x20 or codepoint == 0x09 or codepoint == 0x0B or codepoint == 0x0C or codepoint == 0xA0
+
+
+@njit(cache=True, parallel=True)
+def detector_codepoints_kernel(
+    offsets: np.ndarray,
+    data: np.ndarray,
+    lowercase: np.ndarray,
+    out_codepoints: np.ndarray,
+    out_lengths: np.ndarray,
+    out_needs_python: np.ndarray,
+) -> None:
+    base = offsets[0]
+    for row in prange(out_lengths.shape[0]):
+        position = offsets[row]
+        end = offsets[row + 1]
+        start = position - base
+        write = start
+        text_end = start
+        in_space_run = False
+        while position < end:
+            lead = data[position]
+            if lead < 0x80:
+                codepoint = int(lead)
+                position += 1
+            else:
+                codepoint, position = decode_utf8(data, position)
+            if write == start and is_space_codepoint(codepoint):
+                continue
+            if is_detector_space_codepoint(codepoint):
+                if not in_space_run:
+                    out_codepoints[write] = 0x20
+                    write += 1
+                    in_space_run = True
+                continue
+            in_space_run = False
+            if codepoint < 0x80:
+                if 0x41 <= codepoint <= 0x5A:
+                    codepoint += 0x20
+                out_codepoints[write] = codepoint
+                write += 1
+            elif codepoint == DOTTED_CAPITAL_I:
+                out_codepoints[write] = 0x69
+                out_codepoints[write + 1] = 0x307
+                write += 2
+            else:
+                if codepoint == CAPITAL_SIGMA:
+                    out_needs_python[row] = True
+                out_codepoints[write] = lowercase[codepoint] if codepoint < lowercase.shape[0] else codepoint
+                write += 1
+            if not is_space_codepoint(codepoint):
+                text_end = write
+        out_lengths[row] = text_end - start
+
+
+@njit(cache=True, nogil=True)
+def japanese_char_counts_kernel(
+    offsets: np.ndarray,
+    data: np.ndarray,
+    sample_chars: int,
+    out_counts: np.ndarray,
+    out_sample_lengths: np.ndarray,
+) -> None:
+    for row in range(out_counts.shape[0]):
+        position = offsets[row]
+        end = offsets[row + 1]
+        count = 0
+        length = 0
+        while position < end and length < sample_chars:
+            codepoint, position = decode_utf8(data, position)
+            if 0x3040 <= codepoint <= 0x30FF or 0x4E00 <= codepoint <= 0x9FFF:
+                count += 1
+            length += 1
+        out_counts[row] = count
+        out_sample_lengths[row] = length
+
+
+def string_buffers(values: pa.Array) -> Tuple[np.ndarray, np.ndarray]:
+    if pa.types.is_large_string(values.type):
+        offset_type = np.int64
+    elif pa.types.is_string(values.type):
+        offset_type = np.int32
+    else:
+        raise TypeError(f"Expected a string array, got {values.type}")
+    _validity, offsets_buffer, data_buffer = values.buffers()
+    offsets = np.frombuffer(offsets_buffer, dtype=offset_type)[values.offset : values.offset + len(values) + 1]
+    data = np.frombuffer(data_buffer, dtype=np.uint8) if data_buffer is not None else np.zeros(0, dtype=np.uint8)
+    return offsets.astype(np.int64), data
+
+
+def normalized_lengths(values: pa.Array) -> np.ndarray:
+    chunks = values.chunks if isinstance(values, pa.ChunkedArray) else [values]
+    parts = []
+    for chunk in chunks:
+        offsets, data = string_buffers(chunk)
+        lengths = np.zeros(len(chunk), dtype=np.int64)
+        normalized_lengths_kernel(offsets, data, lengths)
+        parts.append(lengths)
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+def collapse_whitespace(values: pa.Array) -> pa.Array:
+    if isinstance(values, pa.ChunkedArray):
+        return pa.chunked_array([collapse_whitespace(chunk) for chunk in values.chunks], type=values.type)
+    offsets, data = string_buffers(values)
+    offset_type = np.int64 if pa.types.is_large_string(values.type) else np.int32
+    out_offsets = np.zeros(len(values) + 1, dtype=offset_type)
+    out_data = np.empty(max(int(offsets[-1] - offsets[0]), 1), dtype=np.uint8)
+    collapse_whitespace_kernel(offsets, data, out_offsets, out_data)
+    validity = None
+    if values.null_count:
+        validity = pc.is_valid(values).buffers()[1]
+    return pa.Array.from_buffers(
+        values.type,
+        len(values),
+        [validity, pa.py_buffer(out_offsets), pa.py_buffer(out_data[: out_offsets[-1]])],
+        null_count=values.null_count,
+    )
+
+
+def text_candidate_stats(values: pa.Array) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    offsets, data = string_buffers(values)
+    normalized_lengths = np.zeros(len(values), dtype=np.int64)
+    hashes = np.zeros(len(values), dtype=np.uint64)
+    stripped_lengths = np.zeros(len(values), dtype=np.int64)
+    with np.errstate(over="ignore"):
+        text_candidate_kernel(offsets, data, normalized_lengths, hashes, stripped_lengths)
+    return normalized_lengths, hashes, stripped_lengths
+
+
+def sha256_hexdigests(values: pa.Array) -> List[str]:
+    offsets, data = string_buffers(values)
+    view = memoryview(data)
+    bounds = offsets.tolist()
+    return [hashlib.sha256(view[start:end]).hexdigest() for start, end in zip(bounds, bounds[1:])]
+
+
+def has_visible_text(values: pa.Array) -> np.ndarray:
+    offsets, data = string_buffers(values)
+    visible = np.zeros(len(values), dtype=np.bool_)
+    has_visible_text_kernel(offsets, data, visible)
+    if values.null_count:
+        visible &= pc.is_valid(values).to_numpy(zero_copy_only=False)
+    return visible
+
+
+def detector_codepoints(
+    values: pa.Array, arena: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    offsets, data = string_buffers(values)
+    starts = offsets - offsets[0]
+    needed = max(int(starts[-1]), 1)
+    codepoints = arena if arena is not None and arena.shape[0] >= needed else np.empty(needed, dtype=np.uint32)
+    lengths = np.zeros(len(values), dtype=np.int64)
+    needs_python = np.zeros(len(values), dtype=np.bool_)
+    detector_codepoints_kernel(offsets, data, lowercase_table(), codepoints, lengths, needs_python)
+    starts = starts[:-1]
+    for row in np.flatnonzero(needs_python).tolist():
+        normalized = detector_normalize_text(values[row].as_py())
+        start = int(starts[row])
+        codepoints[start : start + len(normalized)] = np.frombuffer(
+            normalized.encode("utf-32-le", errors="surrogatepass"), dtype=np.uint32
+        )
+    return codepoints, starts, starts + lengths
+
+
+def japanese_char_counts(values: pa.Array) -> Tuple[np.ndarray, np.ndarray]:
+    offsets, data = string_buffers(values)
+    counts = np.zeros(len(values), dtype=np.int64)
+    sample_lengths = np.zeros(len(values), dtype=np.int64)
+    japanese_char_counts_kernel(offsets, data, JAPANESE_SAMPLE_CHARS, counts, sample_lengths)
+    return counts, sample_lengths
+
+
+def warm_up() -> None:
+    values = pa.array(["Warm  up", None])
+    has_visible_text(values)
+    normalized_lengths(values)
+    collapse_whitespace(values)
+    text_candidate_stats(pc.fill_null(values, ""))
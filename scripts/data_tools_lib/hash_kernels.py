@@ -0,0 +1,121 @@
+"""Numba kernels for the hashed-trigram detector score."""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+import pyarrow as pa
+
+from data_tools_lib.arrow_kernels import detector_codepoints, japanese_char_counts, njit, prange
+
+try:
+    import numba
+except ImportError:  # pragma: no cover - optional runtime dependency
+    numba = None
+
+FNV32_OFFSET_BASIS = 2166136261
+FNV32_PRIME = 16777619
+
+
+@njit(cache=True, inline="always")
+def hash_trigram_bucket(codepoints: np.ndarray, start: int, dim: int) -> int:
+    h = FNV32_OFFSET_BASIS
+    for index in range(3):
+        h ^= np.int64(codepoints[start + index])
+        h = (h * FNV32_PRIME) & 0xFFFFFFFF
+    if dim & (dim - 1) == 0:
+        return h & (dim - 1)
+    return h % dim
+
+
+@njit(cache=True)
+def naive_bayes_logit(codepoints: np.ndarray, delta: np.ndarray, prior: float, dim: int) -> float:
+    logit = prior
+    for index in range(codepoints.shape[0] - 2):
+        logit += delta[hash_trigram_bucket(codepoints, index, dim)]
+    return logit
+
+
+@njit(cache=True)
+def logistic_logit(codepoints: np.ndarray, weights: np.ndarray, bias: float, dim: int) -> float:
+    trigram_count = max(1, codepoints.shape[0] - 2)
+    total = 0.0
+    for index in range(codepoints.shape[0] - 2):
+        total += weights[hash_trigram_bucket(codepoints, index, dim)]
+    return bias + total / trigram_count
+
+
+@njit(cache=True, inline="always")
+def sigmoid(value: float) -> float:
+    if value >= 0:
+        z = math.exp(-value)
+        return 1.0 / (1.0 + z)
+    z = math.exp(value)
+    return z / (1.0 + z)
+
+
+@njit(cache=True, parallel=True)
+def hash_scores_kernel(
+    codepoints: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    rows: np.ndarray,
+    max_chars: int,
+    table: np.ndarray,
+    bias: float,
+    dim: int,
+    logistic: bool,
+    out_scores: np.ndarray,
+) -> None:
+    for index in prange(rows.shape[0]):
+        row = rows[index]
+        start = starts[row]
+        end = ends[row]
+        if end - start < 3:
+            out_scores[index] = 0.5
+            continue
+        row_codepoints = codepoints[start : min(end, start + max_chars)]
+        if logistic:
+            out_scores[index] = sigmoid(logistic_logit(row_codepoints, table, bias, dim))
+        else:
+            out_scores[index] = sigmoid(naive_bayes_logit(row_codepoints, table, bias, dim))
+
+
+def text_codepoints(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le", errors="surrogatepass"), dtype=np.uint32)
+
+
+def hash_scores(
+    codepoints: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    rows: np.ndarray,
+    max_chars: int,
+    table: np.ndarray,
+    bias: float,
+    dim: int,
+    logistic: bool,
+) -> np.ndarray:
+    scores = np.empty(len(rows), dtype=np.float64)
+    hash_scores_kernel(codepoints, starts, ends, rows, max_chars, table, bias, dim, logistic, scores)
+    return scores
+
+
+def limit_threads(count: int) -> None:
+    if numba is not None:
+        numba.set_num_threads(count)
+
+
+def warm_up() -> None:
+    texts = pa.array(["Warm up"])
+    japanese_char_counts(texts)
+    codepoints, starts, ends = detector_codepoints(texts)
+    rows = np.zeros(1, dtype=np.int64)
+    table = np.zeros(4, dtype=np.float64)
+    naive_bayes_logit(codepoints, table, 0.0, 4)
+    logistic_logit(codepoints, table, 0.0, 4)
+    hash_scores(codepoints, starts, ends, rows, 200, table, 0.0, 4, False)
+    table.setflags(write=False)
+    hash_scores(codepoints, starts, ends, rows, 200, table, 0.0, 4, False)
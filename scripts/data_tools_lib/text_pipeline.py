@@ -7,6 +7,7 @@ import hashlib
 import json
 import math
 import re
+import shutil
 import statistics
 import urllib.parse
 import urllib.request
@@ -49,6 +50,7 @@ DEFAULT_HYBRID_MODEL_JA_PATH = Path("data/processed/hybrid_hash_nb_model_4096_ja
 DEFAULT_MODEL_JS_PATH = Path("src/content/hash-model.js")
 DEFAULT_MODEL_JS_JA_PATH = Path("src/content/hash-model-ja.js")
 DEFAULT_COLLECT_LIVE_OUTPUT = Path("data/live_eval/live_seed.csv")
+DOWNLOAD_CHUNK_SIZE = 1 << 20
 GSINGH_PARQUET_PATH = Path("data/raw/gsingh1-py__train/0000__0000.parquet")
 DMITVA_PARQUET_DIR = Path("data/raw/dmitva__human_ai_generated_text")
 JAPANESE_HUMAN_PARQUET_PATHS = [
@@ -62,6 +64,8 @@ JAPANESE_AI_MESSAGE_PARQUET_PATHS = [
 JAPANESE_AI_INSTRUCTION_PARQUET_PATH = Path("data/raw/CausalLM__GPT-4-Self-Instruct-Japanese/0000__0000.parquet")
 
 JP_CHAR_RE = re.compile(r"[\u3040-\u30ff\u4e00-\u9fff]")
+JAPANESE_SAMPLE_CHARS = 2400
+DETECTOR_SPACE_RE = re.compile(r"[ \t\f\v]+")
 HIRAGANA_RE = re.compile(r"[\u3040-\u309f]")
 KATAKANA_RE = re.compile(r"[\u30a0-\u30ff]")
 KANJI_RE = re.compile(r"[\u4e00-\u9fff]")
@@ -266,11 +270,11 @@ class LiveRecord:
 
 
 def collapse_whitespace(text: str) -> str:
-    return re.sub(r"\s+", " ", str(text or "").replace("\u00a0", " ")).strip()
+    return " ".join(str(text or "").split())
 
 
 def detector_normalize_text(value: str) -> str:
-    return re.sub(r"[ \t\f\v]+", " ", str(value or "").replace("\u00a0", " ")).strip().lower()
+    return DETECTOR_SPACE_RE.sub(" ", str(value or "").replace("\u00a0", " ")).strip().lower()
 
 
 def text_hash(text: str) -> str:
@@ -363,7 +367,7 @@ def tokenize_words(text: str) -> List[str]:
 
 
 def is_likely_japanese_text(text: str) -> bool:
-    sample = str(text or "")[:2400]
+    sample = str(text or "")[:JAPANESE_SAMPLE_CHARS]
     if not sample:
         return False
     jp_count = len(JP_CHAR_RE.findall(sample))
@@ -584,12 +588,30 @@ def sanitize_dataset_name(name: str) -> str:
     return name.replace("/", "__")
 
 
-def ensure_download(url: str, out_path: Path) -> None:
+def create_download_session(pool_size: int) -> Optional["requests.Session"]:
+    if requests is None:
+        return None
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def ensure_download(url: str, out_path: Path, session: Optional["requests.Session"] = None) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
     if out_path.exists() and out_path.stat().st_size > 0:
         return
     tmp_path = out_path.with_suffix(out_path.suffix + ".part")
-    urllib.request.urlretrieve(url, tmp_path)
+    if requests is not None:
+        with (session or requests).get(url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with tmp_path.open("wb") as handle:
+                shutil.copyfileobj(response.raw, handle, length=DOWNLOAD_CHUNK_SIZE)
+    else:
+        with urllib.request.urlopen(url, timeout=60) as response, tmp_path.open("wb") as handle:
+            shutil.copyfileobj(response, handle, length=DOWNLOAD_CHUNK_SIZE)
     tmp_path.rename(out_path)
 
 